@@ -1,143 +1,275 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-import psycopg2
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 import json, configparser, os, sys, threading
 from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
 import base64
-import time
+import io
+import hashlib
+
+# 优先使用 psycopg 3（支持 pipeline 模式），未安装时回退到 psycopg2
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+    import psycopg2
+
+# pipeline 模式需要 psycopg >= 3.1 且链接的 libpq >= 14，不满足时逐条执行查询
+_PIPELINE_SUPPORTED = (psycopg is not None and hasattr(psycopg, 'Pipeline')
+                       and psycopg.Pipeline.is_supported())
+
+# 列信息，直接读取 pg_catalog，避免 information_schema.columns 视图逐列的权限检查；
+# 各字段的取值与 information_schema.columns 保持一致（域类型按其基础类型计算）
+_COLUMNS_SQL = """
+    SELECT
+        c.relname AS table_name,
+        a.attname AS column_name,
+        CASE WHEN a.attnotnull OR (t.typtype = 'd' AND t.typnotnull) THEN 'NO' ELSE 'YES' END AS is_nullable,
+        CASE
+            WHEN bt.typelem <> 0 AND bt.typlen = -1 THEN 'ARRAY'
+            WHEN bn.nspname = 'pg_catalog' THEN format_type(bt.oid, NULL)
+            ELSE 'USER-DEFINED'
+        END AS data_type,
+        information_schema._pg_char_max_length(bt.oid, tm.typmod) AS character_maximum_length,
+        information_schema._pg_numeric_precision(bt.oid, tm.typmod) AS numeric_precision,
+        information_schema._pg_numeric_scale(bt.oid, tm.typmod) AS numeric_scale,
+        information_schema._pg_datetime_precision(bt.oid, tm.typmod) AS datetime_precision,
+        bt.typname AS udt_name,
+        a.attnum AS ordinal_position
+    FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_type t ON t.oid = a.atttypid
+        JOIN pg_type bt ON bt.oid = CASE WHEN t.typtype = 'd' THEN t.typbasetype ELSE t.oid END
+        JOIN pg_namespace bn ON bn.oid = bt.typnamespace
+        CROSS JOIN LATERAL (
+            SELECT CASE WHEN t.typtype = 'd' THEN t.typtypmod ELSE a.atttypmod END AS typmod
+        ) tm
+    WHERE n.nspname = %s
+        AND c.relkind IN ('r', 'v', 'f', 'p')
+        AND a.attnum > 0
+        AND NOT a.attisdropped
+    ORDER BY c.relname, a.attname
+"""
+
+# 含列的表数量，与 _COLUMNS_SQL 覆盖的表一致，用于显示进度
+_TABLE_COUNT_SQL = """
+    SELECT count(*)
+    FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s
+        AND c.relkind IN ('r', 'v', 'f', 'p')
+        AND EXISTS (
+            SELECT 1 FROM pg_attribute a
+            WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        )
+"""
+
+# 主键信息
+_PRIMARY_KEYS_SQL = """
+    SELECT 
+        tc.table_name,
+        kcu.column_name
+    FROM information_schema.table_constraints tc
+    JOIN information_schema.key_column_usage kcu 
+        ON tc.constraint_name = kcu.constraint_name
+        AND tc.table_schema = kcu.table_schema
+    WHERE tc.constraint_type = 'PRIMARY KEY'
+        AND tc.table_schema = %s
+    ORDER BY tc.table_name, kcu.ordinal_position;
+"""
+
+# 索引信息，每个索引一行，列名按索引定义顺序聚合为数组
+_INDEXES_SQL = """
+    SELECT
+        t.relname AS table_name,
+        i.relname AS index_name,
+        array_agg(a.attname::text ORDER BY array_position(ix.indkey::int2[], a.attnum)) AS columns,
+        ix.indisunique AS is_unique
+    FROM pg_index ix
+        JOIN pg_class i ON i.oid = ix.indexrelid
+        JOIN pg_class t ON t.oid = ix.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = ANY(ix.indkey)
+    WHERE n.nspname = %s
+    GROUP BY t.relname, i.relname, ix.indisunique
+    ORDER BY t.relname, i.relname;
+"""
+
+# 外键信息
+_FOREIGN_KEYS_SQL = """
+    SELECT
+        kcu.table_name,
+        tc.constraint_name,
+        kcu.column_name,
+        ccu.table_name AS foreign_table_name,
+        ccu.column_name AS foreign_column_name
+    FROM
+        information_schema.table_constraints AS tc
+        JOIN information_schema.key_column_usage AS kcu
+            ON tc.constraint_name = kcu.constraint_name
+            AND tc.table_schema = kcu.table_schema
+        JOIN information_schema.constraint_column_usage AS ccu
+            ON ccu.constraint_name = tc.constraint_name
+            AND ccu.table_schema = tc.table_schema
+    WHERE tc.constraint_type = 'FOREIGN KEY'
+        AND tc.table_schema = %s
+    ORDER BY kcu.table_name, tc.constraint_name;
+"""
+
+# 列信息元组中各字段的名称，与 _COLUMNS_SQL 的列顺序一致（不含 table_name）
+_COL_FIELDS = ('name', 'nullable', 'type', 'max_length', 'numeric_precision',
+               'numeric_scale', 'datetime_precision', 'udt_name', 'position')
+
+# 缓存的文本报告数量上限
+_REPORT_CACHE_SIZE = 4
+
+# 未发现差异时显示的文本
+_NO_DIFF_TEXT = "未发现差异！"
+
+# 文本报告中单个表的段落模板，没有差异的部分填入空字符串
+_TABLE_REPORT_TEMPLATE = (
+    "\n表 {table_name}:\n"
+    "{columns_missing_in_db1}{columns_missing_in_db2}{column_details}"
+    "{primary_keys}"
+    "{indexes_missing_in_db1}{indexes_missing_in_db2}"
+    "{foreign_keys_missing_in_db1}{foreign_keys_missing_in_db2}"
+)
+_PRIMARY_KEYS_TEMPLATE = "  主键差异:\n    {db1_label}: {pk1}\n    {db2_label}: {pk2}\n"
+
+# 表差异中缺少某部分时使用的空值
+_EMPTY_MISSING_DIFF = {'missing_in_db1': [], 'missing_in_db2': []}
+_EMPTY_COLUMN_DIFF = {'missing_in_db1': [], 'missing_in_db2': [], 'differences': {}}
+
+# 后台生成的报告每帧最多写入的段数（每个表为一段）及写入间隔（毫秒）
+_REPORT_CHUNKS_PER_FRAME = 200
+_REPORT_PUMP_INTERVAL = 16
+
+# 报告中逐项列出的列字段及其显示名称
+_COL_DIFF_LABELS = (
+    ('type', '数据类型'),
+    ('max_length', '最大长度'),
+    ('numeric_precision', '精度'),
+    ('numeric_scale', '小数位'),
+    ('datetime_precision', '时间精度'),
+    ('nullable', '可空性'),
+    ('position', '位置')
+)
+
+# 文本报告中各字段差异行的前缀，预先拼好避免每行重复拼接
+_COL_DIFF_PREFIXES = {label: f"      - {label}: " for _, label in _COL_DIFF_LABELS}
+
+# 按 _COL_DIFF_LABELS 的顺序从列信息元组中一次取出这些字段
+_col_diff_values = itemgetter(*(_COL_FIELDS.index(field) for field, _ in _COL_DIFF_LABELS))
+
+def _column_field_diffs(column1: Tuple, column2: Tuple) -> Iterator[Tuple]:
+    """逐个生成两个列定义中取值不同的字段：(显示名称, 值1, 值2)，调用方直接写入输出"""
+    values1, values2 = _col_diff_values(column1), _col_diff_values(column2)
+    # 仅 udt_name 等未列出的字段不同时，一次元组比较即可返回
+    if values1 == values2:
+        return
+    for (_, label), value1, value2 in zip(_COL_DIFF_LABELS, values1, values2):
+        if value1 != value2:
+            yield label, value1, value2
+
+def connect_db(params: Dict):
+    """建立数据库连接"""
+    # 只读取元数据，以只读事务运行
+    if psycopg is not None:
+        conn = psycopg.connect(**params)
+        conn.read_only = True
+    else:
+        conn = psycopg2.connect(**params)
+        conn.set_session(readonly=True)
+    return conn
+
+def _decode_pwd(encoded: str) -> str:
+    """解码Base64编码的密码，失败时返回空字符串"""
+    try:
+        return base64.b64decode((encoded + '=' * (-len(encoded) % 4)).encode()).decode()
+    except Exception:
+        return ''
 
 class SchemaComparator:
     def __init__(self, db1_params: Dict, db2_params: Dict):
         """初始化数据库连接"""
-        self.db1_conn = psycopg2.connect(**db1_params)
-        self.db2_conn = psycopg2.connect(**db2_params)
+        # 两个连接并行建立，握手耗时不再叠加
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(connect_db, params) for params in (db1_params, db2_params)]
+        
+        # 任一连接失败时关闭另一个已建立的连接
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            for future in futures:
+                if future.exception() is None:
+                    future.result().close()
+            raise errors[0]
+        self.db1_conn, self.db2_conn = (future.result() for future in futures)
         
     def get_tables_structure(self, conn, schema_name: str, queue: Queue = None, db_label: str = "") -> Dict:
         """获取指定schema下所有表的结构"""
         try:
-            cursor = conn.cursor()
-            
             if queue:
                 queue.put(("status", f"正在获取{db_label}的表结构..."))
             
-            # 一次性查询所有表的列信息
-            cursor.execute("""
-                SELECT 
-                    table_name,
-                    column_name,
-                    is_nullable,
-                    data_type,
-                    character_maximum_length,
-                    numeric_precision,
-                    numeric_scale,
-                    datetime_precision,
-                    udt_name,
-                    ordinal_position
-                FROM information_schema.columns 
-                WHERE table_schema = %s
-                ORDER BY table_name, column_name
-            """, (schema_name,))
-            
-            columns = cursor.fetchall()
-            total_tables = len(set(col[0] for col in columns))
-            current_table = None
-            table_count = 0
-            
-            # 组织数据结构
+            queries = (_COLUMNS_SQL, _TABLE_COUNT_SQL, _PRIMARY_KEYS_SQL, _INDEXES_SQL, _FOREIGN_KEYS_SQL)
+            if psycopg is not None:
+                # psycopg 3: 列信息使用二进制格式传输，数值字段无需文本解析
+                cursors = [conn.cursor(binary=True)] + [conn.cursor() for _ in queries[1:]]
+                if _PIPELINE_SUPPORTED:
+                    # 所有查询在同一批次发送，只需一次往返
+                    with conn.pipeline():
+                        for cursor, sql in zip(cursors, queries):
+                            cursor.execute(sql, (schema_name,))
+                else:
+                    for cursor, sql in zip(cursors, queries):
+                        cursor.execute(sql, (schema_name,))
+            else:
+                # psycopg2: 列信息使用服务端游标分批读取，限制内存峰值
+                columns_cursor = conn.cursor(name=f'schema_scan_{id(self)}')
+                columns_cursor.itersize = 10000
+                cursors = [columns_cursor] + [conn.cursor() for _ in queries[1:]]
+                for cursor, sql in zip(cursors, queries):
+                    cursor.execute(sql, (schema_name,))
+            columns_cursor, count_cursor, pk_cursor, index_cursor, fk_cursor = cursors
+            total_tables = count_cursor.fetchone()[0]
+            
+            # 结果已按表名排序，逐表分组构建数据结构，不再一次性 fetchall 整个结果集
             tables_structure = {}
-            for row in columns:
-                table_name = row[0]
-                if table_name != current_table:
-                    current_table = table_name
-                    table_count += 1
-                    if queue:
-                        queue.put(("progress", f"{db_label}进度: {table_count}/{total_tables} ({table_name})"))
-                
-                if table_name not in tables_structure:
-                    tables_structure[table_name] = {
-                        'columns': [],
-                        'primary_keys': [],
-                        'indexes': [],
-                        'foreign_keys': []
-                    }
-                tables_structure[table_name]['columns'].append(row[1:])
+            for table_count, (table_name, rows) in enumerate(groupby(columns_cursor, key=itemgetter(0)), 1):
+                # 每个表名只驻留一次，字典键共享同一字符串对象
+                table_name = sys.intern(table_name)
+                if queue:
+                    queue.put(("progress", f"{db_label}进度: {table_count}/{total_tables} ({table_name})"))
+                tables_structure[table_name] = {
+                    'columns': {sys.intern(row[1]): row[1:] for row in rows},
+                    'primary_keys': [],
+                    'indexes': [],
+                    'foreign_keys': []
+                }
 
             # 获取主键信息
-            cursor.execute("""
-                SELECT 
-                    tc.table_name,
-                    kcu.column_name
-                FROM information_schema.table_constraints tc
-                JOIN information_schema.key_column_usage kcu 
-                    ON tc.constraint_name = kcu.constraint_name
-                    AND tc.table_schema = kcu.table_schema
-                WHERE tc.constraint_type = 'PRIMARY KEY'
-                    AND tc.table_schema = %s
-                ORDER BY tc.table_name, kcu.ordinal_position;
-            """, (schema_name,))
-            
-            for table_name, column_name in cursor.fetchall():
+            for table_name, column_name in pk_cursor.fetchall():
                 if table_name in tables_structure:
                     tables_structure[table_name]['primary_keys'].append(column_name)
 
             # 获取索引信息
-            cursor.execute("""
-                SELECT
-                    t.relname as table_name,
-                    i.relname as index_name,
-                    a.attname as column_name,
-                    ix.indisunique as is_unique
-                FROM
-                    pg_class t,
-                    pg_class i,
-                    pg_index ix,
-                    pg_attribute a,
-                    pg_namespace n
-                WHERE
-                    t.oid = ix.indrelid
-                    and i.oid = ix.indexrelid
-                    and a.attrelid = t.oid
-                    and a.attnum = ANY(ix.indkey)
-                    and t.relnamespace = n.oid
-                    and n.nspname = %s
-                ORDER BY
-                    t.relname,
-                    i.relname;
-            """, (schema_name,))
-            
-            for table_name, index_name, column_name, is_unique in cursor.fetchall():
-                if table_name in tables_structure:
-                    tables_structure[table_name]['indexes'].append((index_name, column_name, is_unique))
+            for row in index_cursor.fetchall():
+                if row[0] in tables_structure:
+                    tables_structure[row[0]]['indexes'].append(row[1:])
 
             # 获取外键信息
-            cursor.execute("""
-                SELECT
-                    kcu.table_name,
-                    tc.constraint_name,
-                    kcu.column_name,
-                    ccu.table_name AS foreign_table_name,
-                    ccu.column_name AS foreign_column_name
-                FROM
-                    information_schema.table_constraints AS tc
-                    JOIN information_schema.key_column_usage AS kcu
-                        ON tc.constraint_name = kcu.constraint_name
-                        AND tc.table_schema = kcu.table_schema
-                    JOIN information_schema.constraint_column_usage AS ccu
-                        ON ccu.constraint_name = tc.constraint_name
-                        AND ccu.table_schema = tc.table_schema
-                WHERE tc.constraint_type = 'FOREIGN KEY'
-                    AND tc.table_schema = %s
-                ORDER BY kcu.table_name, tc.constraint_name;
-            """, (schema_name,))
-            
-            for table_name, constraint_name, column_name, foreign_table, foreign_column in cursor.fetchall():
+            for table_name, constraint_name, column_name, foreign_table, foreign_column in fk_cursor.fetchall():
                 if table_name in tables_structure:
                     tables_structure[table_name]['foreign_keys'].append(
                         (constraint_name, column_name, foreign_table, foreign_column)
                     )
 
-            cursor.close()
+            for cursor in cursors:
+                cursor.close()
             return tables_structure
                 
         except Exception as e:
@@ -146,40 +278,37 @@ class SchemaComparator:
             raise
     def compare_table_structure(self, table1: Dict, table2: Dict, table_name: str) -> Dict:
         """比较单个表的结构差异"""
-        differences = {}
+        # 结构完全一致的表（通常占绝大多数）直接跳过逐项比较
+        if table1 == table2:
+            return None
         
-        # 比较列
-        columns1 = {col[0]: col for col in table1['columns']}
-        columns2 = {col[0]: col for col in table2['columns']}
-        
-        # 检查缺失的列
-        missing_in_db1 = [col for col in columns2.keys() if col not in columns1]
-        missing_in_db2 = [col for col in columns1.keys() if col not in columns2]
-        
-        # 检查列定义差异
-        column_diffs = {}
-        for col_name in set(columns1.keys()) & set(columns2.keys()):
-            if columns1[col_name] != columns2[col_name]:
-                column_diffs[col_name] = {
-                    'db1': dict(zip(
-                        ['name', 'nullable', 'type', 'max_length', 'numeric_precision', 
-                         'numeric_scale', 'datetime_precision', 'udt_name', 'position'],
-                        columns1[col_name]
-                    )),
-                    'db2': dict(zip(
-                        ['name', 'nullable', 'type', 'max_length', 'numeric_precision', 
-                         'numeric_scale', 'datetime_precision', 'udt_name', 'position'],
-                        columns2[col_name]
-                    ))
-                }
+        differences = {}
         
-        if missing_in_db1 or missing_in_db2 or column_diffs:
-            differences['columns'] = {
-                'missing_in_db1': missing_in_db1,
-                'missing_in_db2': missing_in_db2,
-                'differences': column_diffs
+        # 比较列（列信息已按列名建立索引），两边完全一致时跳过逐列比较
+        columns1 = table1['columns']
+        columns2 = table2['columns']
+        if columns1 != columns2:
+            # 检查缺失的列（直接对列名键视图做集合差运算）
+            missing_in_db1 = sorted(columns2.keys() - columns1.keys())
+            missing_in_db2 = sorted(columns1.keys() - columns2.keys())
+            
+            # 检查列定义差异
+            # 只保存两边的原始列信息元组，显示时再按需取出各字段；按列名顺序插入
+            column_diffs = {
+                col_name: (columns1[col_name], columns2[col_name])
+                for col_name in sorted(
+                    name for name in columns1.keys() & columns2.keys()
+                    if columns1[name] != columns2[name]
+                )
             }
             
+            if missing_in_db1 or missing_in_db2 or column_diffs:
+                differences['columns'] = {
+                    'missing_in_db1': missing_in_db1,
+                    'missing_in_db2': missing_in_db2,
+                    'differences': column_diffs
+                }
+            
         # 比较主键
         if table1['primary_keys'] != table2['primary_keys']:
             differences['primary_keys'] = {
@@ -187,91 +316,61 @@ class SchemaComparator:
                 'db2': table2['primary_keys']
             }
             
-        # 比较索引
-        indexes1 = {idx[0]: idx for idx in table1['indexes']}
-        indexes2 = {idx[0]: idx for idx in table2['indexes']}
-        
-        missing_indexes_db1 = [idx for idx in indexes2.keys() if idx not in indexes1]
-        missing_indexes_db2 = [idx for idx in indexes1.keys() if idx not in indexes2]
-        
-        if missing_indexes_db1 or missing_indexes_db2:
-            differences['indexes'] = {
-                'missing_in_db1': missing_indexes_db1,
-                'missing_in_db2': missing_indexes_db2
-            }
+        # 比较索引（两边的索引列表完全一致时跳过）
+        if table1['indexes'] != table2['indexes']:
+            indexes1 = {idx[0] for idx in table1['indexes']}
+            indexes2 = {idx[0] for idx in table2['indexes']}
             
-        # 比较外键
-        fk1 = {fk[0]: fk for fk in table1['foreign_keys']}
-        fk2 = {fk[0]: fk for fk in table2['foreign_keys']}
-        
-        missing_fk_db1 = [fk for fk in fk2.keys() if fk not in fk1]
-        missing_fk_db2 = [fk for fk in fk1.keys() if fk not in fk2]
-        
-        if missing_fk_db1 or missing_fk_db2:
-            differences['foreign_keys'] = {
-                'missing_in_db1': missing_fk_db1,
-                'missing_in_db2': missing_fk_db2
-            }
+            missing_indexes_db1 = sorted(indexes2 - indexes1)
+            missing_indexes_db2 = sorted(indexes1 - indexes2)
+            
+            if missing_indexes_db1 or missing_indexes_db2:
+                differences['indexes'] = {
+                    'missing_in_db1': missing_indexes_db1,
+                    'missing_in_db2': missing_indexes_db2
+                }
+            
+        # 比较外键（两边的外键列表完全一致时跳过）
+        if table1['foreign_keys'] != table2['foreign_keys']:
+            fk1 = {fk[0] for fk in table1['foreign_keys']}
+            fk2 = {fk[0] for fk in table2['foreign_keys']}
+            
+            missing_fk_db1 = sorted(fk2 - fk1)
+            missing_fk_db2 = sorted(fk1 - fk2)
+            
+            if missing_fk_db1 or missing_fk_db2:
+                differences['foreign_keys'] = {
+                    'missing_in_db1': missing_fk_db1,
+                    'missing_in_db2': missing_fk_db2
+                }
             
         return differences if differences else None
 
     def compare_schemas(self, schema_name: str, queue: Queue = None, db1_label: str = "", db2_label: str = "") -> Dict:
         try:
-            # 创建两个队列用于接收各自的进度
-            db1_queue = Queue()
-            db2_queue = Queue()
+            # 两个线程分别查询两个数据库，进度直接写入调用方的队列，
+            # 完成或出错时向同一个结果队列发送带数据库编号的事件
+            scan_queue = Queue()
             
-            # 创建两个线程分别查询两个数据库
-            def get_db1_structure():
-                try:
-                    result = self.get_tables_structure(self.db1_conn, schema_name, db1_queue, db1_label)
-                    db1_queue.put(("complete", result))
-                except Exception as e:
-                    db1_queue.put(("error", str(e)))
-                    
-            def get_db2_structure():
+            def get_structure(db_num, conn, db_label):
                 try:
-                    result = self.get_tables_structure(self.db2_conn, schema_name, db2_queue, db2_label)
-                    db2_queue.put(("complete", result))
+                    result = self.get_tables_structure(conn, schema_name, queue, db_label)
+                    scan_queue.put(("complete", db_num, result))
                 except Exception as e:
-                    db2_queue.put(("error", str(e)))
-            
-            thread1 = threading.Thread(target=get_db1_structure)
-            thread2 = threading.Thread(target=get_db2_structure)
-            
-            thread1.start()
-            thread2.start()
-            
-            # 等待两个线程完成
-            db1_result = None
-            db2_result = None
-            
-            while True:
-                # 检查是否有错误
-                if not db1_queue.empty():
-                    status, data = db1_queue.get()
-                    if status == "error":
-                        raise Exception(f"数据库1错误: {data}")
-                    elif status in ["status", "progress"]:
-                        if queue:
-                            queue.put((status, data))
-                    elif status == "complete":
-                        db1_result = data
-                        
-                if not db2_queue.empty():
-                    status, data = db2_queue.get()
-                    if status == "error":
-                        raise Exception(f"数据库2错误: {data}")
-                    elif status in ["status", "progress"]:
-                        if queue:
-                            queue.put((status, data))
-                    elif status == "complete":
-                        db2_result = data
-                
-                if db1_result is not None and db2_result is not None:
-                    break
-                    
-                time.sleep(0.1)
+                    scan_queue.put(("error", db_num, e))
+            
+            for db_num, conn, db_label in ((1, self.db1_conn, db1_label), (2, self.db2_conn, db2_label)):
+                threading.Thread(target=get_structure, args=(db_num, conn, db_label), daemon=True).start()
+            
+            # 阻塞等待两个线程的结果，任一数据库出错时立即结束
+            results = {}
+            while len(results) < 2:
+                status, db_num, data = scan_queue.get()
+                if status == "error":
+                    raise Exception(f"数据库{db_num}错误: {data}")
+                results[db_num] = data
+            db1_result = results[1]
+            db2_result = results[2]
             
             if queue:
                 queue.put(("status", "正在比较差异..."))
@@ -286,8 +385,8 @@ class SchemaComparator:
             db1_table_names = set(db1_result.keys())
             db2_table_names = set(db2_result.keys())
             
-            differences['missing_in_db1'] = list(db2_table_names - db1_table_names)
-            differences['missing_in_db2'] = list(db1_table_names - db2_table_names)
+            differences['missing_in_db1'] = sorted(db2_table_names - db1_table_names)
+            differences['missing_in_db2'] = sorted(db1_table_names - db2_table_names)
             
             # 比较共同表的结构
             common_tables = db1_table_names & db2_table_names
@@ -312,6 +411,73 @@ class SchemaComparator:
         """关闭数据库连接"""
         self.db1_conn.close()
         self.db2_conn.close()
+def _bullet_block(items, indent: str = '    - ') -> str:
+    """将（已排序的）名称格式化为逐行列表"""
+    return ''.join(indent + item + '\n' for item in items)
+
+def _format_keys(columns: List[str]) -> str:
+    """格式化主键列，没有主键时显示“无”"""
+    return ', '.join(columns) if columns else '无'
+
+def _missing_section(title: str, names: List[str]) -> str:
+    """表内缺失对象的列表段落，没有缺失时为空字符串"""
+    return f"  {title}:\n{_bullet_block(names)}" if names else ''
+
+def _column_details(column_differences: Dict) -> str:
+    """列定义差异段落，没有差异时为空字符串"""
+    if not column_differences:
+        return ''
+    buf = io.StringIO()
+    w = buf.write
+    w("  列定义差异:\n")
+    for col_name, columns in column_differences.items():
+        w(f"    {col_name}:\n")
+        for label, value1, value2 in _column_field_diffs(*columns):
+            w(f"{_COL_DIFF_PREFIXES[label]}{value1} -> {value2}\n")
+    return buf.getvalue()
+
+def _iter_diff_report(differences: Dict, db1_label: str, db2_label: str):
+    """逐段生成文本报告：每组缺失的表为一段，每个存在差异的表为一段"""
+    if not any(differences.values()):
+        yield _NO_DIFF_TEXT
+        return
+        
+    if differences['missing_in_db1']:
+        yield f"{db1_label}中缺失的表:\n" + _bullet_block(differences['missing_in_db1'], '  - ') + "\n"
+        
+    if differences['missing_in_db2']:
+        yield f"{db2_label}中缺失的表:\n" + _bullet_block(differences['missing_in_db2'], '  - ') + "\n"
+        
+    if differences['structure_diff']:
+        yield "表结构差异:\n"
+        # 各段标题只与标识有关，每份报告只拼接一次
+        titles = {
+            (section, db_label): f"{db_label}中缺失的{name}"
+            for section, name in (('columns', '列'), ('indexes', '索引'), ('foreign_keys', '外键'))
+            for db_label in (db1_label, db2_label)
+        }
+        for table_name, diff in differences['structure_diff'].items():
+            columns = diff.get('columns', _EMPTY_COLUMN_DIFF)
+            indexes = diff.get('indexes', _EMPTY_MISSING_DIFF)
+            foreign_keys = diff.get('foreign_keys', _EMPTY_MISSING_DIFF)
+            primary_keys = diff.get('primary_keys')
+            yield _TABLE_REPORT_TEMPLATE.format_map({
+                'table_name': table_name,
+                'columns_missing_in_db1': _missing_section(titles['columns', db1_label], columns['missing_in_db1']),
+                'columns_missing_in_db2': _missing_section(titles['columns', db2_label], columns['missing_in_db2']),
+                'column_details': _column_details(columns['differences']),
+                'primary_keys': _PRIMARY_KEYS_TEMPLATE.format_map({
+                    'db1_label': db1_label,
+                    'db2_label': db2_label,
+                    'pk1': _format_keys(primary_keys['db1']),
+                    'pk2': _format_keys(primary_keys['db2'])
+                }) if primary_keys else '',
+                'indexes_missing_in_db1': _missing_section(titles['indexes', db1_label], indexes['missing_in_db1']),
+                'indexes_missing_in_db2': _missing_section(titles['indexes', db2_label], indexes['missing_in_db2']),
+                'foreign_keys_missing_in_db1': _missing_section(titles['foreign_keys', db1_label], foreign_keys['missing_in_db1']),
+                'foreign_keys_missing_in_db2': _missing_section(titles['foreign_keys', db2_label], foreign_keys['missing_in_db2'])
+            })
+
 class DBCompareGUI:
     def __init__(self, root):
         self.root = root
@@ -332,11 +498,22 @@ class DBCompareGUI:
             self.config_file = os.path.join(os.path.expanduser("~"), "db_compare_config.ini")
         
         self.result_queue = Queue()
+        # 最近生成的文本报告，键为比较结果与标识的摘要
+        self._report_cache = {}
+        # 当前显示的比较结果、其标识以及已渲染的标签页
+        self._differences = None
+        self._display_labels = None
+        self._rendered_tabs = set()
+        # 树形视图中尚未展开过的节点及创建其子节点的方法
+        self._tree_loaders = {}
+        # 每显示一次新结果加一，用于丢弃尚未写完的旧报告
+        self._report_generation = 0
         self.load_config()
         self.create_gui()
 
     def load_config(self):
-        self.config = configparser.ConfigParser()
+        # 配置值不使用插值，密码等字段中的 % 按原样保存
+        self.config = configparser.RawConfigParser()
         default_config = {
             'DB1': {
                 'host': 'localhost',
@@ -364,27 +541,9 @@ class DBCompareGUI:
                 print(f"已加载配置文件: {os.path.abspath(self.config_file)}")
                 
                 # 解码密码
-                if self.config.has_section('DB1') and 'password' in self.config['DB1']:
-                    try:
-                        encoded_pwd = self.config['DB1']['password']
-                        padding = len(encoded_pwd) % 4
-                        if padding:
-                            encoded_pwd += '=' * (4 - padding)
-                        pwd = base64.b64decode(encoded_pwd.encode()).decode()
-                        self.config['DB1']['password'] = pwd
-                    except:
-                        self.config['DB1']['password'] = ''
-                        
-                if self.config.has_section('DB2') and 'password' in self.config['DB2']:
-                    try:
-                        encoded_pwd = self.config['DB2']['password']
-                        padding = len(encoded_pwd) % 4
-                        if padding:
-                            encoded_pwd += '=' * (4 - padding)
-                        pwd = base64.b64decode(encoded_pwd.encode()).decode()
-                        self.config['DB2']['password'] = pwd
-                    except:
-                        self.config['DB2']['password'] = ''
+                for section in ('DB1', 'DB2'):
+                    if self.config.has_option(section, 'password'):
+                        self.config[section]['password'] = _decode_pwd(self.config[section]['password'])
             else:
                 for section, values in default_config.items():
                     if not self.config.has_section(section):
@@ -484,8 +643,11 @@ class DBCompareGUI:
         button_frame = ttk.Frame(self.root)
         button_frame.pack(fill=tk.X, padx=5, pady=5)
         
-        ttk.Button(button_frame, text="测试连接", command=self.test_connection).pack(side=tk.LEFT, padx=5)
-        ttk.Button(button_frame, text="开始比较", command=self.compare_schemas).pack(side=tk.LEFT, padx=5)
+        test_button = ttk.Button(button_frame, text="测试连接", command=self.test_connection)
+        test_button.pack(side=tk.LEFT, padx=5)
+        compare_button = ttk.Button(button_frame, text="开始比较", command=self.compare_schemas)
+        compare_button.pack(side=tk.LEFT, padx=5)
+        self._buttons = [test_button, compare_button]
         
         # 进度显示区域
         progress_frame = ttk.Frame(self.root)
@@ -507,8 +669,31 @@ class DBCompareGUI:
         result_frame = ttk.LabelFrame(self.root, text="比较结果", padding="5")
         result_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.result_text = scrolledtext.ScrolledText(result_frame, wrap=tk.WORD)
-        self.result_text.pack(fill=tk.BOTH, expand=True)
+        # 文本报告与树形视图分两个标签页显示
+        self.result_notebook = ttk.Notebook(result_frame)
+        self.result_notebook.pack(fill=tk.BOTH, expand=True)
+        
+        # 结果文本框只用于显示报告，关闭撤销记录，大量写入时不再累积撤销栈
+        self.result_text = scrolledtext.ScrolledText(self.result_notebook, wrap=tk.WORD,
+                                                     undo=False, autoseparators=False, maxundo=0)
+        self.result_notebook.add(self.result_text.frame, text="文本")
+        
+        tree_frame = ttk.Frame(self.result_notebook)
+        self.result_tree = ttk.Treeview(tree_frame, columns=('db1', 'db2'))
+        self.result_tree.heading('#0', text="对象")
+        tree_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.result_tree.yview)
+        self.result_tree.configure(yscrollcommand=tree_scrollbar.set)
+        tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.result_tree.pack(fill=tk.BOTH, expand=True)
+        self.result_notebook.add(tree_frame, text="树形")
+        self.result_tree.bind('<<TreeviewOpen>>', self._on_tree_open)
+        
+        # 各标签页对应的渲染方法，只渲染当前可见的标签页
+        self._tab_renderers = {
+            str(self.result_text.frame): self.display_text,
+            str(tree_frame): self.display_tree
+        }
+        self.result_notebook.bind('<<NotebookTabChanged>>', lambda event: self._render_current_tab())
 
     def save_config(self):
         try:
@@ -575,10 +760,7 @@ class DBCompareGUI:
 
     def test_connection(self):
         try:
-            conn1 = psycopg2.connect(**self.get_db_params(1))
-            conn1.close()
-            conn2 = psycopg2.connect(**self.get_db_params(2))
-            conn2.close()
+            SchemaComparator(self.get_db_params(1), self.get_db_params(2)).close()
             self.save_config()
             messagebox.showinfo("成功", "两个数据库连接测试成功！")
         except Exception as e:
@@ -625,7 +807,7 @@ class DBCompareGUI:
                             elif data.startswith(db2_label):
                                 self.db2_progress_var.set(data)
                         elif status == "error":
-                            raise Exception(data)
+                            self.progress_var.set(data)
                 except Empty:
                     pass
                 self.root.after(100, process_queue)
@@ -663,110 +845,175 @@ class DBCompareGUI:
             messagebox.showerror("错误", f"处理结果失败：{str(e)}")
 
     def disable_buttons(self):
-        for child in self.root.winfo_children():
-            if isinstance(child, ttk.Frame):
-                for button in child.winfo_children():
-                    if isinstance(button, ttk.Button):
-                        button.configure(state='disabled')
+        for button in self._buttons:
+            button.configure(state='disabled')
                     
     def enable_buttons(self):
-        for child in self.root.winfo_children():
-            if isinstance(child, ttk.Frame):
-                for button in child.winfo_children():
-                    if isinstance(button, ttk.Button):
-                        button.configure(state='normal')
+        for button in self._buttons:
+            button.configure(state='normal')
 
     def display_results(self, differences: Dict):
+        self._report_generation += 1
+        self._differences = differences
+        self._display_labels = (
+            self.db1_label_entry.get() or "数据库1",
+            self.db2_label_entry.get() or "数据库2"
+        )
+        self._rendered_tabs = set()
+        self._render_current_tab()
+        
+    def _render_current_tab(self):
+        """渲染当前可见的结果标签页，其他标签页在切换到时才渲染"""
+        if self._differences is None:
+            return
+        tab = self.result_notebook.select()
+        if tab in self._rendered_tabs:
+            return
+        self._rendered_tabs.add(tab)
+        self._tab_renderers[tab](self._differences, *self._display_labels)
+        
+    def display_text(self, differences: Dict, db1_label: str, db2_label: str):
+        """在文本框中显示差异报告"""
+        # 没有差异时无需计算缓存键或启动后台线程
+        if not any(differences.values()):
+            self._set_result_text(_NO_DIFF_TEXT)
+            return
+        
+        # 缓存键的计算、报告的生成都在后台线程中进行，界面线程按帧分批写入，避免阻塞主循环
         self.result_text.delete(1.0, tk.END)
-        db1_label = self.db1_label_entry.get() or "数据库1"
-        db2_label = self.db2_label_entry.get() or "数据库2"
-        
-        if differences['missing_in_db1']:
-            self.result_text.insert(tk.END, f"{db1_label}中缺失的表:\n")
-            for table in sorted(differences['missing_in_db1']):
-                self.result_text.insert(tk.END, f"  - {table}\n")
-            self.result_text.insert(tk.END, "\n")
-            
-        if differences['missing_in_db2']:
-            self.result_text.insert(tk.END, f"{db2_label}中缺失的表:\n")
-            for table in sorted(differences['missing_in_db2']):
-                self.result_text.insert(tk.END, f"  - {table}\n")
-            self.result_text.insert(tk.END, "\n")
-            
-        if differences['structure_diff']:
-            self.result_text.insert(tk.END, "表结构差异:\n")
-            for table_name in sorted(differences['structure_diff'].keys()):
-                diff = differences['structure_diff'][table_name]
-                self.result_text.insert(tk.END, f"\n表 {table_name}:\n")
+        chunks = Queue()
+        
+        def format_report():
+            try:
+                cache_key = hashlib.blake2b(
+                    json.dumps([differences, db1_label, db2_label], sort_keys=True).encode(),
+                    digest_size=16
+                ).digest()
+                # 相同的比较结果和标识再次显示时直接复用已生成的报告
+                report = self._report_cache.get(cache_key)
+                if report is not None:
+                    chunks.put(report)
+                else:
+                    for chunk in _iter_diff_report(differences, db1_label, db2_label):
+                        chunks.put(chunk)
+                # 以缓存键作为结束标记，由界面线程写入缓存
+                chunks.put(cache_key)
+            except Exception as e:
+                chunks.put(e)
+        
+        threading.Thread(target=format_report, daemon=True).start()
+        self.root.after(_REPORT_PUMP_INTERVAL, self._pump_report, chunks, [], self._report_generation)
+        
+    def _set_result_text(self, report: str):
+        """一次性替换文本框内容，并滚动回顶部"""
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, report)
+        self.result_text.yview_moveto(0)
+        
+    def _pump_report(self, chunks: Queue, parts: List[str], generation: int):
+        """将后台生成的报告段写入文本框，每帧最多写入 _REPORT_CHUNKS_PER_FRAME 段；
+        收到缓存键（bytes）表示报告已完整生成"""
+        # 已开始显示新的比较结果，丢弃旧报告
+        if generation != self._report_generation:
+            return
+        
+        batch = []
+        cache_key = None
+        try:
+            while len(batch) < _REPORT_CHUNKS_PER_FRAME:
+                chunk = chunks.get_nowait()
+                if isinstance(chunk, bytes):
+                    cache_key = chunk
+                    break
+                if isinstance(chunk, Exception):
+                    self.result_text.insert(tk.END, ''.join(batch) + f"\n生成报告失败：{str(chunk)}")
+                    return
+                batch.append(chunk)
+        except Empty:
+            pass
+        
+        if batch:
+            self.result_text.insert(tk.END, ''.join(batch))
+            parts.extend(batch)
+        
+        if cache_key is not None:
+            self._report_cache[cache_key] = ''.join(parts)
+            if len(self._report_cache) > _REPORT_CACHE_SIZE:
+                del self._report_cache[next(iter(self._report_cache))]
+        else:
+            self.root.after(_REPORT_PUMP_INTERVAL, self._pump_report, chunks, parts, generation)
+        
+    def display_tree(self, differences: Dict, db1_label: str, db2_label: str):
+        """在树形视图中按 表 -> 列/主键/索引/外键 分层显示差异，子节点在首次展开时才创建"""
+        tree = self.result_tree
+        tree.delete(*tree.get_children())
+        tree.heading('db1', text=db1_label)
+        tree.heading('db2', text=db2_label)
+        self._tree_loaders = {}
+        
+        for names, missing_in_db1, label in (
+            (differences['missing_in_db1'], True, db1_label),
+            (differences['missing_in_db2'], False, db2_label)
+        ):
+            if names:
+                self._insert_lazy_node('', f"{label}中缺失的表",
+                                       lambda node, names=names, missing_in_db1=missing_in_db1:
+                                           self._insert_presence(node, names, missing_in_db1))
                 
-                if 'columns' in diff:
-                    if diff['columns']['missing_in_db1']:
-                        self.result_text.insert(tk.END, f"  {db1_label}中缺失的列:\n")
-                        for col in sorted(diff['columns']['missing_in_db1']):
-                            self.result_text.insert(tk.END, f"    - {col}\n")
-                            
-                    if diff['columns']['missing_in_db2']:
-                        self.result_text.insert(tk.END, f"  {db2_label}中缺失的列:\n")
-                        for col in sorted(diff['columns']['missing_in_db2']):
-                            self.result_text.insert(tk.END, f"    - {col}\n")
-                            
-                    if diff['columns']['differences']:
-                        self.result_text.insert(tk.END, "  列定义差异:\n")
-                        for col_name in sorted(diff['columns']['differences'].keys()):
-                            col_diff = diff['columns']['differences'][col_name]
-                            db1_info = col_diff['db1']
-                            db2_info = col_diff['db2']
-                            
-                            self.result_text.insert(tk.END, f"    {col_name}:\n")
-                            differences_found = []
-                            
-                            if db1_info['type'] != db2_info['type']:
-                                differences_found.append(f"数据类型: {db1_info['type']} -> {db2_info['type']}")
-                            if db1_info['max_length'] != db2_info['max_length']:
-                                differences_found.append(f"最大长度: {db1_info['max_length']} -> {db2_info['max_length']}")
-                            if db1_info['numeric_precision'] != db2_info['numeric_precision']:
-                                differences_found.append(f"精度: {db1_info['numeric_precision']} -> {db2_info['numeric_precision']}")
-                            if db1_info['numeric_scale'] != db2_info['numeric_scale']:
-                                differences_found.append(f"小数位: {db1_info['numeric_scale']} -> {db2_info['numeric_scale']}")
-                            if db1_info['datetime_precision'] != db2_info['datetime_precision']:
-                                differences_found.append(f"时间精度: {db1_info['datetime_precision']} -> {db2_info['datetime_precision']}")
-                            if db1_info['nullable'] != db2_info['nullable']:
-                                differences_found.append(f"可空性: {db1_info['nullable']} -> {db2_info['nullable']}")
-                            if db1_info['position'] != db2_info['position']:
-                                differences_found.append(f"位置: {db1_info['position']} -> {db2_info['position']}")
-                                
-                            for diff_desc in differences_found:
-                                self.result_text.insert(tk.END, f"      - {diff_desc}\n")
+        for table_name, diff in differences['structure_diff'].items():
+            self._insert_lazy_node('', f"表 {table_name}",
+                                   lambda node, diff=diff: self._load_table_node(node, diff))
+            
+    def _insert_lazy_node(self, parent: str, text: str, loader, values: Tuple = ()) -> str:
+        """插入一个折叠节点，其子节点由 loader 在首次展开时创建"""
+        tree = self.result_tree
+        node = tree.insert(parent, 'end', text=text, values=values)
+        # 占位子节点，使折叠的节点显示展开标记
+        tree.insert(node, 'end')
+        self._tree_loaders[node] = loader
+        return node
+        
+    def _on_tree_open(self, event):
+        tree = self.result_tree
+        node = tree.focus()
+        loader = self._tree_loaders.pop(node, None)
+        if loader:
+            tree.delete(*tree.get_children(node))
+            loader(node)
+            
+    def _insert_presence(self, parent: str, names: List[str], missing_in_db1: bool):
+        presence = ("缺失", "存在") if missing_in_db1 else ("存在", "缺失")
+        for name in names:
+            self.result_tree.insert(parent, 'end', text=name, values=presence)
+            
+    def _load_table_node(self, table_node: str, diff: Dict):
+        """创建单个表节点下的列、主键、索引、外键子节点"""
+        tree = self.result_tree
+        
+        if 'columns' in diff:
+            self._insert_lazy_node(table_node, "列",
+                                   lambda node: self._load_columns_node(node, diff['columns']))
                 
-                if 'primary_keys' in diff:
-                    self.result_text.insert(tk.END, "  主键差异:\n")
-                    self.result_text.insert(tk.END, f"    {db1_label}: {', '.join(diff['primary_keys']['db1']) or '无'}\n")
-                    self.result_text.insert(tk.END, f"    {db2_label}: {', '.join(diff['primary_keys']['db2']) or '无'}\n")
-                    
-                if 'indexes' in diff:
-                    if diff['indexes']['missing_in_db1']:
-                        self.result_text.insert(tk.END, f"  {db1_label}中缺失的索引:\n")
-                        for idx in sorted(diff['indexes']['missing_in_db1']):
-                            self.result_text.insert(tk.END, f"    - {idx}\n")
-                            
-                    if diff['indexes']['missing_in_db2']:
-                        self.result_text.insert(tk.END, f"  {db2_label}中缺失的索引:\n")
-                        for idx in sorted(diff['indexes']['missing_in_db2']):
-                            self.result_text.insert(tk.END, f"    - {idx}\n")
-                            
-                if 'foreign_keys' in diff:
-                    if diff['foreign_keys']['missing_in_db1']:
-                        self.result_text.insert(tk.END, f"  {db1_label}中缺失的外键:\n")
-                        for fk in sorted(diff['foreign_keys']['missing_in_db1']):
-                            self.result_text.insert(tk.END, f"    - {fk}\n")
-                            
-                    if diff['foreign_keys']['missing_in_db2']:
-                        self.result_text.insert(tk.END, f"  {db2_label}中缺失的外键:\n")
-                        for fk in sorted(diff['foreign_keys']['missing_in_db2']):
-                            self.result_text.insert(tk.END, f"    - {fk}\n")
-        
-        if not any(differences.values()):
-            self.result_text.insert(tk.END, "未发现差异！")
+        if 'primary_keys' in diff:
+            tree.insert(table_node, 'end', text="主键", values=(
+                _format_keys(diff['primary_keys']['db1']),
+                _format_keys(diff['primary_keys']['db2'])
+            ))
+            
+        for key, text in (('indexes', "索引"), ('foreign_keys', "外键")):
+            if key in diff:
+                node = tree.insert(table_node, 'end', text=text)
+                self._insert_presence(node, diff[key]['missing_in_db1'], True)
+                self._insert_presence(node, diff[key]['missing_in_db2'], False)
+                
+    def _load_columns_node(self, node: str, column_diff: Dict):
+        tree = self.result_tree
+        self._insert_presence(node, column_diff['missing_in_db1'], True)
+        self._insert_presence(node, column_diff['missing_in_db2'], False)
+        for col_name, columns in column_diff['differences'].items():
+            col_node = tree.insert(node, 'end', text=col_name)
+            for label, value1, value2 in _column_field_diffs(*columns):
+                tree.insert(col_node, 'end', text=label, values=(value1, value2))
 
 if __name__ == "__main__":
     root = tk.Tk()